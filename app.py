@@ -8,25 +8,41 @@ Versão ajustada:
 """
 
 import os
+import re
+import csv
+import hashlib
 import time
 import json
 import random
 import logging
+from collections import deque
 import tempfile
-import platform
-from datetime import datetime
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from typing import Dict, Optional
 
 import pandas as pd
-import pyperclip
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
-from message_generator import generate_dynamic_message
+from message_generator import generate_many
+
+# Dependências opcionais para leitura rápida da planilha de contatos
+try:
+    import python_calamine  # noqa: F401
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
 
 
 # -----------------------
@@ -34,42 +50,87 @@ from message_generator import generate_dynamic_message
 # -----------------------
 DEFAULT_CONFIG = {
     "contacts_file": "contatos.xlsx",
-    "sent_log_file": "enviados.xlsx",
+    "contacts_engine": "calamine",        # Cai para o engine padrão se python-calamine faltar
+    "sent_log_file": "enviados.csv",
+    "legacy_sent_log_file": "enviados.xlsx",  # Log antigo; importado uma vez para o CSV, nunca sobrescrito
+    "sent_export_file": "enviados_export.xlsx",
     "checkpoint_file": "checkpoint.json",
     "profile_dir": os.path.join(tempfile.gettempdir(), "whatsapp_session"),
     "min_interval_seconds": 120,          # 2 minutos
     "max_interval_seconds": 480,          # 8 minutos
     "block_size": 15,                     # Enviar 15 mensagens por bloco
     "block_pause_seconds": 1800,          # 30 minutos entre blocos
-    "typing_delay_min": 0.03,
-    "typing_delay_max": 0.12,
-    "pause_probability": 0.07,
-    "correction_probability": 0.05,
     "send_windows": [["08:00", "19:00"]],
-    "max_messages_per_hour": 60,
+    "max_messages_per_hour": 60,          # 0 ou null desativa o limite
     "max_messages_per_day": 300,
+    "rate_limit_file": "rate_limits.json",  # Horários dos últimos envios (janela deslizante)
     "retry_attempts": 3,
     "retry_backoff_seconds": 5,
     "randomize_order": True,
     "perform_periodic_actions": True,
     "periodic_action_probability": 0.4,
-    "webdriver_wait_seconds": 40
+    "webdriver_wait_seconds": 40,
+    "spa_navigation_wait_seconds": 10,    # Espera da navegação interna antes de recarregar a página
+    "chromedriver_path": None             # Preenchido automaticamente após o primeiro download
 }
 
+WHATSAPP_URL = "https://web.whatsapp.com"
+MESSAGE_BOX_XPATH = "//footer//div[@role='textbox']"
+# Troca de conversa dentro do SPA, sem recarregar o WhatsApp Web
+SPA_NAVIGATE_JS = (
+    "window.history.pushState({}, '', '/send?phone=' + arguments[0]);"
+    "window.dispatchEvent(new PopStateEvent('popstate'));"
+)
+# Confirma que a conversa aberta (#main) é do número esperado, pelo data-id das mensagens
+CHAT_IS_FOR_PHONE_JS = (
+    "return document.querySelector('#main [data-id*=\"' + arguments[0] + '@\"]') !== null;"
+)
+
+# Limite de cada espera pela janela, para reavaliar o relógio após ajustes/suspensão
+MAX_WINDOW_SLEEP_SECONDS = 3600
+
+SENT_LOG_COLUMNS = ["NOME", "CONTATO", "TIMESTAMP"]
+
+_NON_DIGIT = re.compile(r"\D+")
+
 
 def load_config(path: str = "config.json") -> dict:
     """Carrega config.json e faz merge com defaults."""
+    merged = DEFAULT_CONFIG.copy()
     if os.path.exists(path):
         with open(path, "r", encoding="utf-8") as f:
             conf = json.load(f)
-        merged = DEFAULT_CONFIG.copy()
         merged.update(conf)
         # Garante caminhos relativos corretos
         base = os.path.dirname(os.path.abspath(__file__))
-        for key in ["contacts_file", "sent_log_file", "checkpoint_file"]:
+        for key in ["contacts_file", "sent_log_file", "legacy_sent_log_file", "sent_export_file",
+                    "checkpoint_file", "rate_limit_file"]:
             merged[key] = os.path.join(base, merged[key])
-        return merged
-    return DEFAULT_CONFIG.copy()
+    # Converte as janelas de envio em objetos time uma única vez
+    merged["_send_windows_parsed"] = [
+        (datetime.strptime(start_s, "%H:%M").time(), datetime.strptime(end_s, "%H:%M").time())
+        for start_s, end_s in merged["send_windows"]
+    ]
+    return merged
+
+
+def update_config_file(path: str, key: str, value):
+    """
+    Grava uma única chave no config.json, preservando as demais, de forma
+    atômica (arquivo temporário + os.replace). Não cria o arquivo: sem
+    config.json o load_config usa os defaults sem reescrever caminhos, e
+    criá-lo mudaria esse comportamento na próxima execução.
+    """
+    if not os.path.exists(path):
+        logging.info("%s não existe; '%s' não será gravado.", path, key)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        conf = json.load(f)
+    conf[key] = value
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(conf, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
 
 
 def setup_logging(logfile="sender.log"):
@@ -82,9 +143,9 @@ def setup_logging(logfile="sender.log"):
 
 def normalize_phone(raw: str) -> Optional[str]:
     """Normaliza número para WhatsApp Web: remove caracteres e adiciona DDI."""
-    if pd.isna(raw):
+    if raw is None or (isinstance(raw, float) and pd.isna(raw)):
         return None
-    s = "".join(ch for ch in str(raw) if ch.isdigit())
+    s = _NON_DIGIT.sub("", str(raw))
     # Adiciona DDI do Brasil (55) se ainda não tiver
     if len(s) == 11:  # 2 dígitos DDD + 9 dígitos do celular
         s = "55" + s
@@ -93,56 +154,124 @@ def normalize_phone(raw: str) -> Optional[str]:
     return s
 
 
-def within_send_windows(cfg: dict) -> bool:
-    now = datetime.now().time()
-    for start_s, end_s in cfg["send_windows"]:
-        start = datetime.strptime(start_s, "%H:%M").time()
-        end = datetime.strptime(end_s, "%H:%M").time()
-        if start <= end:
-            if start <= now <= end:
-                return True
-        else:  # Janela cruza meia-noite
-            if now >= start or now <= end:
-                return True
-    return False
+def read_contacts_file(path: str, engine: Optional[str] = "calamine") -> pd.DataFrame:
+    """Lê a planilha de contatos, reaproveitando um snapshot Parquet enquanto o XLSX não mudar."""
+    cache_path = os.path.splitext(path)[0] + ".parquet"
+    meta_path = cache_path + ".meta"
+    mtime = repr(os.path.getmtime(path))
+
+    if HAS_PYARROW and os.path.exists(cache_path) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            if f.read().strip() == mtime:
+                return pd.read_parquet(cache_path)
+
+    if engine == "calamine" and not HAS_CALAMINE:
+        engine = None
+    df = pd.read_excel(path, engine=engine)
+
+    if HAS_PYARROW:
+        try:
+            df.to_parquet(cache_path, index=False)
+            with open(meta_path, "w", encoding="utf-8") as f:
+                f.write(mtime)
+        except Exception as e:
+            logging.warning("Não foi possível gravar o cache de contatos: %s", e)
+    return df
+
+
+def _in_window(start, end, now) -> bool:
+    if start <= end:
+        return start <= now <= end
+    return now >= start or now <= end  # Janela cruza meia-noite
+
+
+def within_send_windows(cfg: dict, now: Optional[datetime] = None) -> bool:
+    current = (now or datetime.now()).time()
+    return any(_in_window(start, end, current) for start, end in cfg["_send_windows_parsed"])
+
+
+def next_window_open(cfg: dict, now: datetime) -> datetime:
+    """Retorna o próximo instante (a partir de now) em que alguma janela de envio está aberta."""
+    current = now.time()
+    candidates = []
+    for start, end in cfg["_send_windows_parsed"]:
+        if _in_window(start, end, current):
+            return now
+        opening = datetime.combine(now.date(), start)
+        if opening <= now:
+            opening += timedelta(days=1)
+        candidates.append(opening)
+    return min(candidates)
 
 
 def human_sleep(min_s: float, max_s: float):
     total = random.uniform(min_s, max_s)
-    logging.info(f"Aguardando {total/60:.1f} minutos antes do próximo envio...")
+    logging.debug("Aguardando %.1f minutos antes do próximo envio...", total / 60)
     time.sleep(total)
 
 
-def send_whatsapp_message(driver, phone_number: str, message: str, cfg: dict) -> bool:
+def find_message_box(driver, timeout: float):
+    """Busca a caixa de texto sem espera; só recorre ao WebDriverWait se ela ainda não existir."""
+    elements = driver.find_elements(By.XPATH, MESSAGE_BOX_XPATH)
+    if elements:
+        return elements[0]
+    wait = WebDriverWait(driver, timeout)
+    return wait.until(EC.presence_of_element_located((By.XPATH, MESSAGE_BOX_XPATH)))
+
+
+# Sessões do WebDriver em que a navegação interna já falhou e não deve ser tentada de novo
+_SPA_DISABLED_SESSIONS = set()
+
+
+def open_chat(driver, phone_number: str, cfg: dict):
+    """Abre a conversa reaproveitando a aba já carregada; recarrega a página só se necessário."""
     wait_seconds = cfg.get("webdriver_wait_seconds", 40)
-    try:
-        logging.info(f"Enviando para {phone_number}...")
-        driver.get(f"https://web.whatsapp.com/send?phone={phone_number}")
 
-        wait = WebDriverWait(driver, wait_seconds)
-        message_box_xpath = "//footer//div[@role='textbox']"
-        message_box = wait.until(EC.presence_of_element_located((By.XPATH, message_box_xpath)))
+    if driver.current_url.startswith(WHATSAPP_URL) and driver.session_id not in _SPA_DISABLED_SESSIONS:
+        spa_wait_seconds = cfg.get("spa_navigation_wait_seconds", 10)
+        driver.execute_script(SPA_NAVIGATE_JS, phone_number)
+        try:
+            # Só aceita a caixa de texto depois de confirmar que a conversa é deste contato;
+            # a caixa antiga ficar obsoleta não basta (o SPA pode só re-renderizar a conversa atual)
+            WebDriverWait(driver, spa_wait_seconds).until(
+                lambda d: d.execute_script(CHAT_IS_FOR_PHONE_JS, phone_number)
+            )
+            return find_message_box(driver, spa_wait_seconds)
+        except TimeoutException:
+            _SPA_DISABLED_SESSIONS.add(driver.session_id)
+            logging.info("Navegação interna não confirmou a conversa; usando recarga completa daqui em diante.")
 
-        time.sleep(random.uniform(1.5, 3.0))
-        pyperclip.copy(message)
+    driver.get(f"{WHATSAPP_URL}/send?phone={phone_number}")
+    return find_message_box(driver, wait_seconds)
 
-        modifier = Keys.COMMAND if platform.system() == "Darwin" else Keys.CONTROL
-        message_box.send_keys(modifier, 'v')
+
+def send_whatsapp_message(driver, phone_number: str, message: str, cfg: dict) -> bool:
+    try:
+        logging.info("Enviando para %s...", phone_number)
+        message_box = open_chat(driver, phone_number, cfg)
+
+        time.sleep(random.uniform(1.5, 3.0))
+        # Insere o texto direto no campo focado via CDP, sem passar pela área de transferência
+        message_box.click()
+        driver.execute_cdp_cmd("Input.insertText", {"text": message})
 
         time.sleep(random.uniform(0.5, 1.0))
         message_box.send_keys(Keys.ENTER)
         time.sleep(random.uniform(2.0, 4.0))
 
-        logging.info(f"Mensagem enviada com sucesso para {phone_number}")
+        logging.info("Mensagem enviada com sucesso para %s", phone_number)
         return True
     except Exception as e:
-        logging.warning(f"Erro ao enviar para {phone_number}: {e}")
+        logging.warning("Erro ao enviar para %s: %s", phone_number, e)
         return False
 
 
 def save_checkpoint(path: str, data: dict):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """Grava o checkpoint de forma atômica: arquivo temporário + os.replace."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
 
 
 def load_checkpoint(path: str) -> dict:
@@ -156,95 +285,243 @@ def load_checkpoint(path: str) -> dict:
     return {}
 
 
+class SendRateLimiter:
+    """
+    Limita envios a max_count por período com uma janela deslizante de horários
+    de envio, garantindo o teto em qualquer intervalo contínuo do período.
+    """
+
+    def __init__(self, max_count: Optional[int], period_seconds: float, timestamps=()):
+        self.max_count = max_count or 0  # 0/None: sem limite
+        self.period = period_seconds
+        self.timestamps = deque(sorted(timestamps))
+
+    def _prune(self, now: float):
+        while self.timestamps and self.timestamps[0] <= now - self.period:
+            self.timestamps.popleft()
+
+    def time_until_available(self) -> float:
+        """Segundos até ser permitido um novo envio (0 se já for)."""
+        if self.max_count <= 0:
+            return 0.0
+        now = time.time()
+        self._prune(now)
+        if len(self.timestamps) < self.max_count:
+            return 0.0
+        # Libera quando o envio mais antigo entre os últimos max_count sair da janela
+        return max(0.0, self.timestamps[-self.max_count] + self.period - now)
+
+    def record(self):
+        now = time.time()
+        self._prune(now)
+        self.timestamps.append(now)
+
+    def to_list(self) -> list:
+        return list(self.timestamps)
+
+
 class SafeSender:
     def __init__(self, driver, cfg: dict):
         self.driver = driver
         self.cfg = cfg
         self.sent_log_file = cfg["sent_log_file"]
+        if self.sent_log_file.lower().endswith((".xlsx", ".xls")):
+            raise ValueError(
+                f"sent_log_file deve ser um CSV (ex.: enviados.csv), não '{self.sent_log_file}'. "
+                "Aponte o log antigo em legacy_sent_log_file para importá-lo automaticamente."
+            )
         self.checkpoint_file = cfg["checkpoint_file"]
         self.checkpoint = load_checkpoint(self.checkpoint_file)
-        self.hourly_count = 0
-        self.daily_count = 0
+        self._last_checkpoint = self.checkpoint
+        self.contacts_fingerprint = None
+        self.rate_limit_file = cfg["rate_limit_file"]
+        rate_state = load_checkpoint(self.rate_limit_file)
+        self.hour_limiter = SendRateLimiter(cfg.get("max_messages_per_hour"), 3600, rate_state.get("hour", []))
+        self.day_limiter = SendRateLimiter(cfg.get("max_messages_per_day"), 86400, rate_state.get("day", []))
+        # Índice leve (um telefone por linha) para deduplicação; o CSV segue como registro legível
+        self._sent_idx_path = os.path.splitext(self.sent_log_file)[0] + ".idx"
+        self.sent_set = self._load_sent_set()
+        self._sent_idx_fh = open(self._sent_idx_path, "a", buffering=1, encoding="utf-8")
+        self._sent_fh = open(self.sent_log_file, "a", newline="", encoding="utf-8")
+        self._sent_writer = csv.DictWriter(self._sent_fh, fieldnames=SENT_LOG_COLUMNS)
+        if self._sent_fh.tell() == 0:
+            self._sent_writer.writeheader()
+
+    def _load_sent_set(self) -> set:
+        """Lê o índice de enviados uma única vez e mantém o conjunto em memória."""
+        if os.path.exists(self._sent_idx_path):
+            with open(self._sent_idx_path, "r", encoding="utf-8") as f:
+                return set(f.read().splitlines())
+        if not os.path.exists(self.sent_log_file):
+            return self._import_legacy_sent_log()
+        # Primeira execução com o índice: reconstrói a partir do CSV existente
+        df_sent = pd.read_csv(self.sent_log_file, usecols=['CONTATO'], dtype=str)
+        sent_set = set(df_sent['CONTATO'].dropna())
+        with open(self._sent_idx_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{contato}\n" for contato in sent_set)
+        return sent_set
+
+    def _import_legacy_sent_log(self) -> set:
+        """Importa uma única vez o log antigo (enviados.xlsx) para o CSV e o índice."""
+        legacy_file = self.cfg.get("legacy_sent_log_file")
+        if not legacy_file or not os.path.exists(legacy_file):
+            return set()
+        df_old = pd.read_excel(legacy_file, dtype=str)
+        if 'CONTATO' not in df_old.columns:
+            raise KeyError(f"Coluna 'CONTATO' não encontrada no log antigo {legacy_file}.")
+        df_old = df_old.reindex(columns=SENT_LOG_COLUMNS).dropna(subset=['CONTATO'])
+        df_old = df_old.drop_duplicates(subset=['CONTATO']).fillna('')
+        df_old.to_csv(self.sent_log_file, index=False, encoding="utf-8")
+        sent_set = set(df_old['CONTATO'])
+        with open(self._sent_idx_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{contato}\n" for contato in sent_set)
+        logging.info("Log antigo %s importado (%d contatos já enviados).", legacy_file, len(sent_set))
+        return sent_set
 
     def load_contacts(self) -> pd.DataFrame:
-        df = pd.read_excel(self.cfg["contacts_file"])
+        df = read_contacts_file(self.cfg["contacts_file"], self.cfg.get("contacts_engine", "calamine"))
         if 'CONTATO' not in df.columns:
             raise KeyError("Coluna 'CONTATO' não encontrada no arquivo de contatos.")
-        df['CONTATO'] = df['CONTATO'].apply(normalize_phone)
-        df = df.dropna(subset=['CONTATO'])
-
-        # Remove contatos já enviados
-        if os.path.exists(self.sent_log_file):
-            df_sent = pd.read_excel(self.sent_log_file)
-            sent_set = set(df_sent['CONTATO'].astype(str))
-            df = df[~df['CONTATO'].astype(str).isin(sent_set)].copy()
-
+        # Mesma regra de normalize_phone, vetorizada sobre a coluna inteira
+        phones = df['CONTATO'].astype('string').str.replace(_NON_DIGIT, '', regex=True)
+        lengths = phones.str.len()
+        phones = phones.mask(lengths == 11, "55" + phones)
+        df = df.assign(CONTATO=phones).loc[(lengths >= 10).fillna(False)].copy()
+
+        # Identifica a planilha (caminho + mtime) para validar o last_index ao retomar
+        contacts_file = self.cfg["contacts_file"]
+        key = f"{os.path.abspath(contacts_file)}:{os.path.getmtime(contacts_file)}"
+        self.contacts_fingerprint = hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+        # Os já enviados não são removidos aqui: são pulados em run(), mantendo os índices estáveis
         if self.cfg.get("randomize_order", True):
-            df = df.sample(frac=1).reset_index(drop=True)
-
-        return df
-
-    def persist_sent(self, sent_records: List[Dict[str, str]]):
-        if not sent_records:
+            # Embaralhamento determinístico por planilha, para o checkpoint apontar sempre ao mesmo contato
+            seed = int(self.contacts_fingerprint[:8], 16)
+            df = df.sample(frac=1, random_state=seed)
+
+        return df.reset_index(drop=True)
+
+    def record_sent(self, record: Dict[str, str]):
+        """Acrescenta um único registro ao log CSV (append-only) e ao conjunto em memória."""
+        self._sent_writer.writerow(record)
+        self._sent_fh.flush()
+        self._sent_idx_fh.write(record["CONTATO"] + "\n")
+        self.sent_set.add(record["CONTATO"])
+
+    def _save_checkpoint(self, idx: int):
+        data = {
+            "contacts_fingerprint": self.contacts_fingerprint,
+            "last_index": idx,
+        }
+        if data == self._last_checkpoint:
+            return
+        save_checkpoint(self.checkpoint_file, data)
+        self._last_checkpoint = data
+
+    def _wait_for_send_slot(self):
+        """Aguarda até o envio ser permitido pelos limites de taxa e pela janela de horário."""
+        while True:
+            wait = max(self.hour_limiter.time_until_available(), self.day_limiter.time_until_available())
+            if wait > 0:
+                logging.info("Limite de envios atingido. Aguardando %.1f minutos...", wait / 60)
+                time.sleep(wait)
+                continue
+            now = datetime.now()
+            if within_send_windows(self.cfg, now):
+                return
+            logging.info("Fora do horário permitido. Aguardando janela...")
+            delay = (next_window_open(self.cfg, now) - now).total_seconds()
+            time.sleep(min(max(0, delay), MAX_WINDOW_SLEEP_SECONDS))
+
+    def _record_send_for_rate_limits(self):
+        """Registra o envio nos limites de taxa e persiste o estado imediatamente."""
+        self.hour_limiter.record()
+        self.day_limiter.record()
+        save_checkpoint(self.rate_limit_file, {
+            "hour": self.hour_limiter.to_list(),
+            "day": self.day_limiter.to_list(),
+        })
+
+    def close(self):
+        for fh in (self._sent_fh, self._sent_idx_fh):
+            if not fh.closed:
+                fh.close()
+
+    def export_xlsx(self):
+        """Exporta o log de enviados para XLSX uma única vez, ao encerrar."""
+        export_file = self.cfg.get("sent_export_file")
+        if not export_file or not os.path.exists(self.sent_log_file):
             return
-        df_new = pd.DataFrame(sent_records)
-        if os.path.exists(self.sent_log_file):
-            df_old = pd.read_excel(self.sent_log_file)
-            df_combined = pd.concat([df_old, df_new], ignore_index=True)
-            df_combined = df_combined.drop_duplicates(subset=['CONTATO'])
-        else:
-            df_combined = df_new
-        df_combined.to_excel(self.sent_log_file, index=False)
-        logging.info(f"Registro de enviados atualizado ({len(sent_records)} contatos).")
+        legacy_file = self.cfg.get("legacy_sent_log_file")
+        if legacy_file and os.path.abspath(export_file) == os.path.abspath(legacy_file):
+            logging.warning("sent_export_file aponta para o log antigo %s; exportação ignorada.", legacy_file)
+            return
+        df = pd.read_csv(self.sent_log_file, dtype=str)
+        df = df.drop_duplicates(subset=['CONTATO'])
+        df.to_excel(export_file, index=False)
+        logging.info("Registro de enviados exportado para %s.", export_file)
 
     def run(self):
         df = self.load_contacts()
-        logging.info(f"Total de contatos a enviar: {len(df)}")
+        pending = int((~df['CONTATO'].astype(str).isin(self.sent_set)).sum())
+        logging.info("Total de contatos a enviar: %d", pending)
 
         last_index = self.checkpoint.get("last_index", -1)
-        sent_records = []
+        if last_index >= 0 and self.checkpoint.get("contacts_fingerprint") != self.contacts_fingerprint:
+            logging.warning("Planilha de contatos mudou desde o último checkpoint; reiniciando do início.")
+            last_index = -1
         block_size = self.cfg.get("block_size", 15)
         block_pause = self.cfg.get("block_pause_seconds", 1800)
-
-        for idx, row in df.reset_index(drop=True).iterrows():
-            if idx <= last_index:
+        processed = 0
+        # Checkpoint a cada poucos envios e em cada fim de bloco; reprocessar contatos é seguro,
+        # pois os já enviados são pulados via sent_set
+        checkpoint_every = min(5, block_size)
+
+        # Extrai as colunas uma vez, evitando montar uma Series por linha
+        contatos = df['CONTATO'].astype(str).to_numpy()
+        nomes = df.get('NOME', pd.Series([''] * len(df))).fillna('').astype(str).str.strip().to_numpy()
+        # Mensagens geradas antes do laço, fora do caminho crítico de envio
+        mensagens = generate_many(nomes.tolist())
+
+        for idx in range(last_index + 1, len(df)):
+            contato = contatos[idx]
+            if contato in self.sent_set:
                 continue
+            nome = nomes[idx]
+            mensagem = mensagens[idx]
 
-            contato = str(row['CONTATO'])
-            nome = row.get('NOME', '').strip()
-            mensagem = generate_dynamic_message(nome)
-
-            if not within_send_windows(self.cfg):
-                logging.info("Fora do horário permitido. Aguardando janela...")
-                while not within_send_windows(self.cfg):
-                    time.sleep(60)
-
+            self._wait_for_send_slot()
             success = send_whatsapp_message(self.driver, contato, mensagem, self.cfg)
 
             if success:
-                sent_records.append({
+                self._record_send_for_rate_limits()
+                self.record_sent({
                     "NOME": nome,
                     "CONTATO": contato,
                     "TIMESTAMP": datetime.now().isoformat()
                 })
 
-            save_checkpoint(self.checkpoint_file, {"last_index": idx})
+            processed += 1
+            end_of_block = processed % block_size == 0
+            if end_of_block or (success and processed % checkpoint_every == 0):
+                self._save_checkpoint(idx)
 
             # Pausa entre mensagens (2 a 8 min)
             if idx < len(df) - 1:
                 human_sleep(self.cfg["min_interval_seconds"], self.cfg["max_interval_seconds"])
 
             # Pausa de bloco (a cada 15 contatos)
-            if (idx + 1) % block_size == 0:
-                logging.info(f"Bloco de {block_size} concluído. Aguardando 30 minutos antes de continuar...")
+            if end_of_block:
+                logging.info("Bloco de %d concluído. Aguardando %.0f minutos antes de continuar...", block_size, block_pause / 60)
                 time.sleep(block_pause)
 
-        if sent_records:
-            self.persist_sent(sent_records)
+        if processed:
+            self._save_checkpoint(len(df) - 1)
         logging.info("Envios finalizados com sucesso.")
 
 
-def create_webdriver(profile_dir: str) -> webdriver.Chrome:
+def create_webdriver(cfg: dict, config_path: str = "config.json") -> webdriver.Chrome:
+    profile_dir = cfg["profile_dir"]
     options = webdriver.ChromeOptions()
     options.add_argument("--start-maximized")
     options.add_argument("--disable-extensions")
@@ -253,18 +530,27 @@ def create_webdriver(profile_dir: str) -> webdriver.Chrome:
     options.add_argument("--disable-dev-shm-usage")
     os.makedirs(profile_dir, exist_ok=True)
     options.add_argument(f"--user-data-dir={profile_dir}")
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
+    # Reaproveita o chromedriver já baixado, evitando a checagem de versão pela rede
+    driver_path = cfg.get("chromedriver_path")
+    if driver_path and os.path.isfile(driver_path) and os.access(driver_path, os.X_OK):
+        try:
+            return webdriver.Chrome(service=Service(driver_path), options=options)
+        except SessionNotCreatedException:
+            logging.warning("chromedriver em cache incompatível com o Chrome instalado; baixando novamente...")
+    driver_path = ChromeDriverManager().install()
+    update_config_file(config_path, "chromedriver_path", driver_path)
+    driver = webdriver.Chrome(service=Service(driver_path), options=options)
     return driver
 
 
 def main():
     cfg = load_config("config.json")
     setup_logging(cfg.get("log_file", "sender.log"))
-    driver = create_webdriver(cfg["profile_dir"])
+    driver = create_webdriver(cfg, "config.json")
+    sender = None
 
     try:
-        driver.get("https://web.whatsapp.com")
+        driver.get(WHATSAPP_URL)
         wait = WebDriverWait(driver, 90)
         logging.info("Aguardando login no WhatsApp Web...")
         wait.until(EC.presence_of_element_located((By.ID, "side")))
@@ -272,8 +558,14 @@ def main():
         sender = SafeSender(driver, cfg)
         sender.run()
     except Exception as e:
-        logging.exception(f"Erro crítico: {e}")
+        logging.exception("Erro crítico: %s", e)
     finally:
+        if sender is not None:
+            sender.close()
+            try:
+                sender.export_xlsx()
+            except Exception as e:
+                logging.warning("Falha ao exportar XLSX de enviados: %s", e)
         time.sleep(5)
         driver.quit()
         logging.info("Execução encerrada.")
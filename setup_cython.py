@@ -0,0 +1,18 @@
+"""
+Compila message_generator.py com Cython (modo Python puro).
+
+A extensão gerada (.so/.pyd) tem prioridade sobre o .py na importação,
+então app.py passa a usá-la sem nenhuma alteração.
+
+Uso:
+    pip install cython
+    python setup_cython.py build_ext --inplace
+"""
+
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name="gabi-zap-message-generator",
+    ext_modules=cythonize(["message_generator.py"], language_level=3),
+)